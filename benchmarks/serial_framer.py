@@ -0,0 +1,89 @@
+"""
+Compare the per command cost of reading serial replies.
+
+'read_until' is how SerialPortTransport used to read: flush the input
+buffer, then pyserial's read_until, which reads one byte per call.
+'framer' is SerialLineFramer, which reads everything waiting at once.
+
+Usage: python -m benchmarks.serial_framer [commands]
+"""
+
+import sys
+import time
+from typing import Callable
+
+import serial  # type: ignore
+from serial.serialutil import SerialBase  # type: ignore
+
+from nad_receiver.nad_transport import SerialLineFramer
+
+REPLY = b"\rMain.Model=T778\r"
+
+
+class FakeAmp(SerialBase):
+    """Replies to every write, counts read calls as syscalls."""
+
+    def __init__(self) -> None:
+        super().__init__(timeout=1)
+        self._rx = bytearray()
+        self.reads = 0
+
+    def open(self) -> None:
+        self.is_open = True
+
+    def _reconfigure_port(self) -> None:
+        pass
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._rx)
+
+    def reset_input_buffer(self) -> None:
+        self._rx.clear()
+
+    def write(self, data: bytes) -> int:
+        self._rx += REPLY
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        self.reads += 1
+        data = bytes(self._rx[:size])
+        del self._rx[:size]
+        return data
+
+
+def read_until(amp: FakeAmp) -> Callable[[], bytes]:
+    def communicate() -> bytes:
+        amp.reset_input_buffer()
+        amp.write(b"\rMain.Model?\r")
+        msg = amp.read_until(serial.CR)
+        if not msg.strip():
+            msg = amp.read_until(serial.CR)
+        return msg.strip()
+    return communicate
+
+
+def framer(amp: FakeAmp) -> Callable[[], bytes]:
+    lines = SerialLineFramer(amp)
+
+    def communicate() -> bytes:
+        lines.mark()
+        amp.write(b"\rMain.Model?\r")
+        return lines.read_frame(b"Main.Model").strip()
+    return communicate
+
+
+def main(commands: int) -> None:
+    for name, path in (("read_until", read_until), ("framer", framer)):
+        amp = FakeAmp()
+        communicate = path(amp)
+        start = time.perf_counter()
+        for _ in range(commands):
+            assert communicate() == REPLY.strip()
+        elapsed = time.perf_counter() - start
+        print(f"{name:>10}: {elapsed / commands * 1e6:7.2f} us/command, "
+              f"{amp.reads / commands:5.1f} reads/command")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -7,11 +7,14 @@ Functions can be found on the NAD website: http://nadelectronics.com/software
 
 import codecs
 import socket
-from time import sleep
+from time import monotonic
 from typing import Any, Dict, Iterable, Optional, Union
 from nad_receiver.nad_commands import CMDS
 from nad_receiver.nad_transport import (NadTransport, SerialPortTransport, TelnetTransportWrapper,
-                                        DEFAULT_TIMEOUT)
+                                        DEFAULT_TIMEOUT, parse_state_line)
+from nad_receiver.nad_history import StateHistory
+from nad_receiver.nad_pacing import AdaptivePacer
+from nad_receiver.nad_state import StatePublisher
 
 import logging
 
@@ -25,6 +28,8 @@ _LOGGER = logging.getLogger("nad_receiver")
 class NADReceiver:
     """NAD receiver."""
     transport: NadTransport
+    publisher: Optional[StatePublisher] = None
+    recorder: Optional[StateHistory] = None
 
     def __init__(self, serial_port: str) -> None:
         """Create RS232 connection."""
@@ -50,10 +55,46 @@ class NADReceiver:
         try:
             msg = self.transport.communicate(cmd)
             _LOGGER.debug(f"sent: '{cmd}' reply: '{msg}'")
-            return msg.split('=')[1]
+            reply = msg.split('=')[1]
         except IndexError:
+            return None
+        # The reply may not be for this command, e.g. a notification for a
+        # turned volume knob, so keep state under the key the reply names
+        parsed = parse_state_line(msg)
+        if parsed and self.publisher:
+            self._publish(*parsed)
+        if parsed and self.recorder is not None:
+            self._record(*parsed)
+        return reply
+
+    def _record(self, key: str, value: str) -> None:
+        """Record a reply in the history, numbers as numbers like main_volume and main_source."""
+        assert self.recorder is not None
+        recorded: Union[str, int, float] = value
+        try:
+            if key == CMDS['main']['volume']['cmd']:
+                recorded = float(value)
+            elif key == CMDS['main']['source']['cmd']:
+                recorded = int(value)
+        except ValueError:
             pass
-        return None
+        self.recorder.record(key, recorded)
+
+    def _publish(self, key: str, value: str) -> None:
+        """Forward a 'Main.Power', 'Main.Mute', 'Main.Volume' or 'Main.Source' value to the publisher."""
+        assert self.publisher
+        main = CMDS['main']
+        if key == main['power']['cmd']:
+            self.publisher.publish(power=value == 'On')
+        elif key == main['mute']['cmd']:
+            self.publisher.publish(muted=value == 'On')
+        elif key == main['source']['cmd']:
+            self.publisher.publish(source=value)
+        elif key == main['volume']['cmd']:
+            try:
+                self.publisher.publish(volume=float(value))
+            except ValueError:
+                pass
 
     def main_dimmer(self, operator: str, value: Optional[str] =None) -> Optional[str]:
         """Execute Main.Dimmer."""
@@ -176,7 +217,38 @@ class NADReceiverTelnet(NADReceiver):
 
     def __init__(self, host: str, port: int =23, timeout: int =DEFAULT_TIMEOUT):
         """Create NADTelnet."""
-        self.transport = TelnetTransportWrapper(host, port, timeout)
+        self.telnet = TelnetTransportWrapper(host, port, timeout, on_banner=self._on_banner)
+        self.transport = self.telnet
+
+    def connect(self) -> bool:
+        """
+        Connect and read the banner the receiver sends on connect.
+
+        Afterwards known_state() holds whatever the banner reported.
+        """
+        return self.telnet.connect()
+
+    def known_state(self) -> Dict[str, str]:
+        """
+        Return the last known values, keyed by e.g. 'Main.Power'.
+
+        Filled from the connect banner and from every reply.
+        """
+        return dict(self.telnet.state)
+
+    def model(self) -> Optional[str]:
+        """Return the model as reported by the banner or Main.Model."""
+        return self.telnet.state.get(CMDS['main']['model']['cmd'])  # type: ignore
+
+    def _on_banner(self, banner: Dict[str, str]) -> None:
+        for function, details in CMDS['main'].items():
+            value = banner.get(details['cmd'])  # type: ignore
+            if value is None:
+                continue
+            if self.publisher:
+                self._publish(details['cmd'], value)  # type: ignore
+            if self.recorder is not None:
+                self._record(details['cmd'], value)  # type: ignore
 
 
 class NADReceiverTCP:
@@ -190,6 +262,7 @@ class NADReceiverTCP:
     POLL_POWER = "0001020209"
     POLL_MUTED = "000102020a"
     POLL_SOURCE = "0001020203"
+    POLL_STATUS = POLL_VOLUME + POLL_POWER + POLL_MUTED + POLL_SOURCE
 
     CMD_POWERSAVE = "00010207000001020207"
     CMD_OFF = "0001020900"
@@ -207,44 +280,64 @@ class NADReceiverTCP:
 
     PORT = 50001
     BUFFERSIZE = 1024
+    # Seconds to wait for the device to accept a connection
+    CONNECT_TIMEOUT = 5.0
+    # Seconds to wait for the complete reply to a message
+    REPLY_TIMEOUT = 1.0
 
-    def __init__(self, host: str) -> None:
+    publisher: Optional[StatePublisher] = None
+    recorder: Optional[StateHistory] = None
+
+    def __init__(self, host: str, port: int =PORT, pacer: Optional[AdaptivePacer] =None) -> None:
         """Setup globals."""
         self._host = host
+        self._port = port
+        # Learns how fast the device takes commands instead of fixed sleeps
+        self._pacer = pacer if pacer else AdaptivePacer()
 
     def _send(self, message: str, read_reply: bool =False) -> Optional[str]:
         """Send a command string to the amplifier."""
         sock: socket.socket
         for tries in range(0, 3):
+            self._pacer.acquire()
             try:
-                sock = socket.create_connection((self._host, self.PORT),
-                                                timeout=5)
+                sock = socket.create_connection((self._host, self._port),
+                                                timeout=self.CONNECT_TIMEOUT)
                 break
             except socket.timeout:
+                # Too busy to accept, the clearest sign to slow down
+                self._pacer.failure()
                 print("Socket connection timed out.")
                 return None
             except (ConnectionError, BrokenPipeError):
+                self._pacer.failure()
                 if tries == 2:
                     print("socket connect failed.")
                     return None
-                sleep(0.1)
         if not sock:
             return None
         with sock:
             sock.send(codecs.decode(message.encode(), encoding='hex_codec'))
             if read_reply:
-                sleep(0.1)
+                # Read until the device has answered every command in the
+                # message, independent of how fast commands are paced
                 reply = ''
-                tries = 0
-                max_tries = 20
-                while len(reply) < len(message) and tries < max_tries:
+                deadline = monotonic() + self.REPLY_TIMEOUT
+                while len(reply) < len(message):
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        break
+                    sock.settimeout(remaining)
                     try:
-                        reply += codecs.encode(sock.recv(self.BUFFERSIZE), 'hex')\
-                            .decode("utf-8")
-                        return reply
-                    except (ConnectionError, BrokenPipeError):
-                        pass
-                    tries += 1
+                        data = sock.recv(self.BUFFERSIZE)
+                    except (socket.timeout, ConnectionError, BrokenPipeError):
+                        break
+                    if not data:
+                        break
+                    reply += codecs.encode(data, 'hex').decode("utf-8")
+                if reply:
+                    return reply
+                self._pacer.failure()
         return None
 
     def status(self) -> Optional[Dict[str, Any]]:
@@ -254,22 +347,54 @@ class NADReceiverTCP:
         Returns a dictionary with keys 'volume' (int 0-200) , 'power' (bool),
          'muted' (bool) and 'source' (str).
         """
-        nad_reply = self._send(self.POLL_VOLUME +
-                               self.POLL_POWER +
-                               self.POLL_MUTED +
-                               self.POLL_SOURCE, read_reply=True)
+        nad_reply = self._send(self.POLL_STATUS, read_reply=True)
         if nad_reply is None:
             return None
 
+        status = self.parse_status(nad_reply)
+        if not status:
+            self._pacer.failure()
+            return None
+        self._pacer.success()
+        if self.publisher:
+            # Publish dB like NADReceiver does, 0 = -90dB and 200 = +10dB
+            self.publisher.publish(**dict(status, volume=self.volume_to_db(status['volume'])))
+        if self.recorder is not None:
+            # Same keys and values as NADReceiver, e.g. 'Main.Power' 'On'
+            main = CMDS['main']
+            on_off = {True: 'On', False: 'Off'}
+            self.recorder.record(main['volume']['cmd'], self.volume_to_db(status['volume']))  # type: ignore
+            self.recorder.record(main['power']['cmd'], on_off[status['power']])  # type: ignore
+            self.recorder.record(main['mute']['cmd'], on_off[status['muted']])  # type: ignore
+            self.recorder.record(main['source']['cmd'], status['source'])  # type: ignore
+        return status
+
+    @classmethod
+    def parse_status(cls, nad_reply: str) -> Optional[Dict[str, Any]]:
+        """
+        Parse the hex reply to POLL_STATUS into a status dictionary.
+
+        Returns None if the reply is not a D 7050 status frame.
+        """
         # split reply into parts of 10 characters
         num_chars = 10
         nad_status = [nad_reply[i:i + num_chars]
                       for i in range(0, len(nad_reply), num_chars)]
+        if len(nad_status) < 4 or nad_status[3][-2:] not in cls.SOURCES_REVERSED:
+            return None
+
+        try:
+            return {'volume': int(nad_status[0][-2:], 16),
+                    'power': nad_status[1][-2:] == '01',
+                    'muted': nad_status[2][-2:] == '01',
+                    'source': cls.SOURCES_REVERSED[nad_status[3][-2:]]}
+        except ValueError:
+            return None
 
-        return {'volume': int(nad_status[0][-2:], 16),
-                'power': nad_status[1][-2:] == '01',
-                'muted': nad_status[2][-2:] == '01',
-                'source': self.SOURCES_REVERSED[nad_status[3][-2:]]}
+    @staticmethod
+    def volume_to_db(volume: int) -> float:
+        """Convert a volume level 0-200 to dB."""
+        return volume / 2 - 90
 
     def power_off(self) -> None:
         """Power the device off."""
@@ -287,7 +412,7 @@ class NADReceiverTCP:
             return None
         if not status['power']:
             self._send(self.CMD_ON, read_reply=True)
-            sleep(0.5)  # Give NAD7050 some time before next command
+            self._pacer.defer(0.5)  # Give NAD7050 some time before next command
 
     def set_volume(self, volume: int) -> None:
         """Set volume level of the device. Accepts integer values 0-200."""
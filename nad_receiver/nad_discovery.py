@@ -0,0 +1,167 @@
+"""
+Find NAD receivers on the local network.
+
+Every address of the given networks is probed concurrently for the telnet
+interface (port 23) and the D 7050 TCP interface (port 50001). A telnet
+device counts as NAD when its connect banner or its reply to 'Main.Model?'
+carries a Main.Model, a TCP device when it answers the status poll with a
+D 7050 status frame.
+
+Usage:
+    receivers = discover(['192.168.1.0/24'])
+"""
+
+import asyncio
+import codecs
+import ipaddress
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+from nad_receiver import NADReceiverTCP, NADReceiverTelnet
+from nad_receiver.nad_commands import CMDS
+
+import logging
+
+_LOGGER = logging.getLogger("nad_receiver.discovery")
+
+TELNET_PORT = 23
+TCP_PORT = NADReceiverTCP.PORT
+DEFAULT_TIMEOUT = 0.5
+DEFAULT_CONCURRENCY = 256
+
+_MODEL_CMD = str(CMDS['main']['model']['cmd'])
+_MODEL = re.compile(re.escape(_MODEL_CMD).encode() + rb"=([^\r\n]*)")
+# Longest Main.Model line looked for, older bytes of a chatty service are dropped
+_MAX_LINE = 256
+
+Receiver = Union[NADReceiverTelnet, NADReceiverTCP]
+
+
+async def _close(writer: asyncio.StreamWriter) -> None:
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+
+
+async def _read_model(reader: asyncio.StreamReader, timeout: float) -> Optional[str]:
+    data = b""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        match = _MODEL.search(data)
+        if match and data[match.end():match.end() + 1] in (b"\r", b"\n"):
+            return match.group(1).decode(errors="replace")
+        # Only a line that is still arriving can match later
+        data = data[-_MAX_LINE:]
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return None
+        try:
+            chunk = await asyncio.wait_for(reader.read(1024), remaining)
+        except asyncio.TimeoutError:
+            return None
+        if not chunk:
+            return None
+        data += chunk
+
+
+async def _probe_telnet(host: str, port: int, timeout: float) -> Optional[NADReceiverTelnet]:
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        # Some firmwares announce the model on connect, others need asking
+        model = await _read_model(reader, timeout)
+        if model is None:
+            writer.write(f"\n{_MODEL_CMD}?\r".encode())
+            await writer.drain()
+            model = await _read_model(reader, timeout)
+    finally:
+        await _close(writer)
+    if model is None:
+        return None
+
+    _LOGGER.debug("Found telnet NAD %s at '%s:%s'", model, host, port)
+    receiver = NADReceiverTelnet(host, port)
+    receiver.telnet.state[_MODEL_CMD] = model
+    return receiver
+
+
+async def _probe_tcp(host: str, port: int, timeout: float) -> Optional[NADReceiverTCP]:
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write(codecs.decode(NADReceiverTCP.POLL_STATUS.encode(), encoding='hex_codec'))
+        await writer.drain()
+        reply = b""
+        while len(reply) * 2 < len(NADReceiverTCP.POLL_STATUS):
+            chunk = await asyncio.wait_for(reader.read(NADReceiverTCP.BUFFERSIZE), timeout)
+            if not chunk:
+                break
+            reply += chunk
+    finally:
+        await _close(writer)
+    if not NADReceiverTCP.parse_status(codecs.encode(reply, 'hex').decode("utf-8")):
+        return None
+
+    _LOGGER.debug("Found TCP NAD at '%s:%s'", host, port)
+    return NADReceiverTCP(host, port)
+
+
+async def async_discover(networks: Iterable[str],
+                         telnet_port: Optional[int] = TELNET_PORT,
+                         tcp_port: Optional[int] = TCP_PORT,
+                         timeout: float = DEFAULT_TIMEOUT,
+                         concurrency: int = DEFAULT_CONCURRENCY) -> List[Receiver]:
+    """
+    Probe every address in networks and return the NAD receivers found.
+
+    networks are addresses or networks in CIDR notation, e.g.
+    '192.168.1.0/24'. Pass None as telnet_port or tcp_port to skip that
+    interface. concurrency workers probe one address at a time each, so
+    at most that many connections are open at the same time. Each probe
+    gives up after timeout seconds per step.
+    """
+    # Parse all networks first so a typo fails before any probe is sent
+    parsed = [ipaddress.ip_network(network, strict=False) for network in networks]
+
+    def targets() -> Iterator[Tuple[int, str, str, int]]:
+        # Lazy, a large network must not become millions of pending probes
+        position = 0
+        for network in parsed:
+            for address in network.hosts():
+                host = str(address)
+                if telnet_port is not None:
+                    yield position, 'telnet', host, telnet_port
+                    position += 1
+                if tcp_port is not None:
+                    yield position, 'tcp', host, tcp_port
+                    position += 1
+
+    pending = targets()
+    found: List[Tuple[int, Receiver]] = []
+
+    async def worker() -> None:
+        # All workers share the iterator, each takes the next probe when free
+        for position, kind, host, port in pending:
+            try:
+                receiver: Optional[Receiver]
+                if kind == 'telnet':
+                    receiver = await _probe_telnet(host, port, timeout)
+                else:
+                    receiver = await _probe_tcp(host, port, timeout)
+            except (OSError, asyncio.TimeoutError):
+                continue
+            if receiver:
+                found.append((position, receiver))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return [receiver for _, receiver in sorted(found, key=lambda item: item[0])]
+
+
+def discover(networks: Iterable[str],
+             telnet_port: Optional[int] = TELNET_PORT,
+             tcp_port: Optional[int] = TCP_PORT,
+             timeout: float = DEFAULT_TIMEOUT,
+             concurrency: int = DEFAULT_CONCURRENCY) -> List[Receiver]:
+    """Blocking version of async_discover."""
+    return asyncio.run(async_discover(networks, telnet_port, tcp_port, timeout, concurrency))
@@ -0,0 +1,265 @@
+"""
+Keep a history of receiver state changes in constant memory.
+
+StateHistory stores timestamped changes in fixed size ring buffers backed
+by array, so a recorder attached for months uses as much memory as on the
+first day. Keys such as 'Main.Source' and string values such as 'CD' are
+interned to small integer codes, numbers and booleans are stored as is.
+A code is reused once no entry in the ring refers to its string any more.
+
+Usage:
+    receiver.recorder = StateHistory(capacity=100000)
+    ...
+    receiver.recorder.between(start, end)  # [(time, 'Main.Source', 'CD'), ...]
+"""
+
+import struct
+import sys
+import threading
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+import logging
+
+_LOGGER = logging.getLogger("nad_receiver.history")
+
+MAGIC = b"NADH"
+FORMAT_VERSION = 1
+# magic, format version, number of strings, number of changes
+_HEADER = struct.Struct("<4sHII")
+_STRING_LENGTH = struct.Struct("<H")
+
+MAX_CODES = 0xFFFF
+
+_NUMBER = 0
+_STRING = 1
+_BOOL = 2
+
+Change = Tuple[float, str, Any]
+
+
+class StateHistory:
+    """Ring buffer of the last capacity state changes."""
+
+    def __init__(self, capacity: int = 10000) -> None:
+        if capacity < 1:
+            raise ValueError('Capacity must be at least 1')
+        self.capacity = capacity
+        self._times = array('d', bytes(8 * capacity))
+        self._keys = array('H', bytes(2 * capacity))
+        self._kinds = array('B', bytes(capacity))
+        self._values = array('d', bytes(8 * capacity))
+        self._start = 0
+        self._count = 0
+        self._strings: List[str] = []
+        self._codes: Dict[str, int] = {}
+        # Entries using each code, a code nothing uses any more is reused
+        self._refs: List[int] = []
+        self._free: List[int] = []
+        # key code -> (kind, value) of the last change, to skip repeats
+        self._last: Dict[int, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _intern(self, string: str) -> Optional[int]:
+        code = self._codes.get(string)
+        if code is None:
+            if self._free:
+                code = self._free.pop()
+                self._strings[code] = string
+            elif len(self._strings) >= MAX_CODES:
+                return None
+            else:
+                code = len(self._strings)
+                self._strings.append(string)
+                self._refs.append(0)
+            self._codes[string] = code
+        return code
+
+    def _ref(self, code: Optional[int]) -> None:
+        if code is not None:
+            self._refs[code] += 1
+
+    def _unref(self, code: Optional[int]) -> None:
+        if code is None:
+            return
+        self._refs[code] -= 1
+        if self._refs[code] == 0:
+            del self._codes[self._strings[code]]
+            self._strings[code] = ""
+            self._free.append(code)
+
+    @staticmethod
+    def _string_code(kind: int, value: float) -> Optional[int]:
+        return int(value) if kind == _STRING else None
+
+    def _encode(self, value: Any) -> Optional[Tuple[int, float]]:
+        if isinstance(value, bool):
+            return _BOOL, float(value)
+        if isinstance(value, (int, float)):
+            return _NUMBER, float(value)
+        code = self._intern(str(value))
+        if code is None:
+            return None
+        return _STRING, float(code)
+
+    def _decode(self, kind: int, value: float) -> Any:
+        if kind == _BOOL:
+            return value != 0
+        if kind == _STRING:
+            return self._strings[int(value)]
+        return value
+
+    def record(self, key: str, value: Any, timestamp: Optional[float] = None) -> bool:
+        """
+        Record value for key if it differs from the last recorded value.
+
+        timestamp defaults to now. A time before the newest recorded one,
+        e.g. after the clock was stepped back, is clamped to that newest
+        time so the history stays in order. Returns True if a change was
+        recorded.
+        """
+        with self._lock:
+            code = self._intern(key)
+            encoded = self._encode(value) if code is not None else None
+            if code is None or encoded is None:
+                # Only possible with more than MAX_CODES strings in use at once
+                _LOGGER.debug("History is out of codes, dropped %s=%s", key, value)
+                if code is not None and not self._refs[code]:
+                    self._ref(code)
+                    self._unref(code)
+                return False
+            last = self._last.get(code)
+            if last == encoded:
+                return False
+
+            # The last value per key holds its codes too, for the check above
+            value_code = self._string_code(*encoded)
+            self._ref(value_code)
+            if last is None:
+                self._ref(code)
+            else:
+                self._unref(self._string_code(*last))
+            self._last[code] = encoded
+
+            recorded = time.time() if timestamp is None else timestamp
+            if self._count:
+                newest = self._times[(self._start + self._count - 1) % self.capacity]
+                recorded = max(recorded, newest)
+
+            index = (self._start + self._count) % self.capacity
+            if self._count == self.capacity:
+                # Release the codes of the entry that is overwritten
+                self._unref(self._keys[index])
+                self._unref(self._string_code(self._kinds[index], self._values[index]))
+                self._start = (self._start + 1) % self.capacity
+            else:
+                self._count += 1
+            self._ref(code)
+            self._ref(value_code)
+            self._times[index] = recorded
+            self._keys[index] = code
+            self._kinds[index] = encoded[0]
+            self._values[index] = encoded[1]
+            return True
+
+    def _bisect(self, timestamp: float) -> int:
+        # First position, oldest first, with a time not before timestamp
+        low, high = 0, self._count
+        while low < high:
+            mid = (low + high) // 2
+            if self._times[(self._start + mid) % self.capacity] < timestamp:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def between(self, start: Optional[float] = None, end: Optional[float] = None,
+                key: Optional[str] = None) -> List[Change]:
+        """
+        Return the changes with start <= time < end, oldest first.
+
+        Either bound may be left out, key limits the result to one key.
+        """
+        with self._lock:
+            first = 0 if start is None else self._bisect(start)
+            last = self._count if end is None else self._bisect(end)
+            code = self._codes.get(key) if key is not None else None
+            if key is not None and code is None:
+                return []
+
+            changes = []
+            for position in range(first, last):
+                index = (self._start + position) % self.capacity
+                if code is not None and self._keys[index] != code:
+                    continue
+                changes.append((self._times[index],
+                                self._strings[self._keys[index]],
+                                self._decode(self._kinds[index], self._values[index])))
+            return changes
+
+    def to_bytes(self) -> bytes:
+        """Export the history in a compact little-endian binary format."""
+        with self._lock:
+            order = [(self._start + position) % self.capacity for position in range(self._count)]
+            # Renumber the codes still in use from 0, in order of appearance
+            renumbered: Dict[int, int] = {}
+            keys = array('H')
+            values = array('d')
+            for index in order:
+                keys.append(renumbered.setdefault(self._keys[index], len(renumbered)))
+                value_code = self._string_code(self._kinds[index], self._values[index])
+                if value_code is None:
+                    values.append(self._values[index])
+                else:
+                    values.append(float(renumbered.setdefault(value_code, len(renumbered))))
+            times = array('d', (self._times[index] for index in order))
+            kinds = array('B', (self._kinds[index] for index in order))
+
+            parts = [_HEADER.pack(MAGIC, FORMAT_VERSION, len(renumbered), self._count)]
+            for code in renumbered:
+                encoded = self._strings[code].encode("utf-8")
+                parts.append(_STRING_LENGTH.pack(len(encoded)))
+                parts.append(encoded)
+            for ordered in (times, values, keys, kinds):
+                if sys.byteorder == 'big':
+                    ordered.byteswap()
+                parts.append(ordered.tobytes())
+            return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, capacity: Optional[int] = None) -> "StateHistory":
+        """Load a history exported with to_bytes."""
+        magic, version, strings, count = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError('Not a NAD state history')
+
+        history = cls(capacity if capacity else max(count, 1))
+        offset = _HEADER.size
+        table = []
+        for _ in range(strings):
+            length = _STRING_LENGTH.unpack_from(data, offset)[0]
+            offset += _STRING_LENGTH.size
+            table.append(data[offset:offset + length].decode("utf-8"))
+            offset += length
+
+        columns = []
+        for typecode in ('d', 'd', 'H', 'B'):
+            column = array(typecode)
+            size = column.itemsize * count
+            column.frombytes(data[offset:offset + size])
+            if sys.byteorder == 'big':
+                column.byteswap()
+            columns.append(column)
+            offset += size
+
+        times, values, keys, kinds = columns
+        for position in range(max(0, count - history.capacity), count):
+            kind, value = kinds[position], values[position]
+            history.record(table[keys[position]],
+                           table[int(value)] if kind == _STRING else history._decode(kind, value),
+                           times[position])
+        return history
@@ -0,0 +1,105 @@
+"""
+Pace commands at the highest rate a receiver handles.
+
+Some NAD firmwares drop or garble commands that are sent back to back.
+Instead of fixed sleeps, AdaptivePacer spaces commands with a token bucket
+whose rate is adjusted additive-increase / multiplicative-decrease: every
+healthy reply raises the rate a little, every empty or garbled reply cuts
+it. The rate settles just below what the device can take.
+"""
+
+import threading
+import time
+from typing import Callable, Optional
+
+from nad_receiver.nad_transport import NadTransport, command_prefix
+
+import logging
+
+_LOGGER = logging.getLogger("nad_receiver.pacing")
+
+
+class AdaptivePacer:
+    """Token bucket with an AIMD adjusted rate, in commands per second."""
+
+    def __init__(self,
+                 rate: float = 10.0,
+                 min_rate: float = 2.0,
+                 max_rate: float = 50.0,
+                 increase: float = 1.0,
+                 decrease: float = 0.5,
+                 burst: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep) -> None:
+        if not 0 < min_rate <= rate <= max_rate:
+            raise ValueError('Rate must be within min_rate and max_rate')
+        if not 0 < decrease < 1:
+            raise ValueError('Decrease must be between 0 and 1')
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = burst
+        self._updated = clock()
+        self._not_before = self._updated
+
+    @property
+    def interval(self) -> float:
+        """Seconds between two commands at the current rate."""
+        return 1 / self.rate
+
+    def acquire(self) -> None:
+        """Block until the next command may be sent."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(self._not_before - now, (1 - self._tokens) / self.rate, 0)
+            # Take the token now, the wait pays for it
+            self._tokens -= 1
+        if wait > 0:
+            self._sleep(wait)
+
+    def defer(self, seconds: float) -> None:
+        """Send nothing for the next seconds, e.g. while the device powers up."""
+        with self._lock:
+            self._not_before = max(self._not_before, self._clock() + seconds)
+
+    def success(self) -> None:
+        """Report a healthy reply."""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def failure(self) -> None:
+        """Report an empty or garbled reply, or a failed connection."""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._tokens = min(self._tokens, 0)
+        _LOGGER.debug("Backing off to %.1f commands/s", self.rate)
+
+
+class PacedTransport(NadTransport):
+    """
+    Pace the commands sent through another transport.
+
+    A reply is healthy when it is for the command that was sent, e.g.
+    'Main.Power=On' for 'Main.Power?'.
+    """
+
+    def __init__(self, transport: NadTransport, pacer: Optional[AdaptivePacer] = None) -> None:
+        self.transport = transport
+        self.pacer = pacer if pacer else AdaptivePacer()
+
+    def communicate(self, command: str) -> str:
+        self.pacer.acquire()
+        rsp = self.transport.communicate(command)
+        if rsp and rsp.startswith(command_prefix(command)):
+            self.pacer.success()
+        else:
+            self.pacer.failure()
+        return rsp
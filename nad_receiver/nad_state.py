@@ -0,0 +1,156 @@
+"""
+Publish the last known receiver state to a memory-mapped file.
+
+Many local consumers (dashboards, automations) only want to know power,
+mute, volume and source. Instead of each of them polling the receiver,
+one process attaches a StatePublisher and every other process reads the
+file with a StateReader, which never touches the transport.
+
+The file has a fixed layout guarded by a sequence counter (a seqlock):
+the writer makes the counter odd while it updates the record and even
+again when done, readers retry until they see the same even counter
+before and after copying the record. Use a path on /dev/shm to keep the
+segment in memory on Linux.
+"""
+
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Any, Dict, Optional
+
+MAGIC = b"NADS"
+LAYOUT_VERSION = 1
+SOURCE_SIZE = 32
+
+# magic, layout version, sequence counter
+_HEADER = struct.Struct("<4sII")
+# timestamp, volume, power, muted, source length, source
+_RECORD = struct.Struct(f"<ddbbB{SOURCE_SIZE}s")
+SIZE = _HEADER.size + _RECORD.size
+
+_SEQ_OFFSET = 8
+_SEQ = struct.Struct("<I")
+
+# Tri-state encoding for booleans, the receiver may not have told us yet
+_UNKNOWN = -1
+
+
+def _encode_bool(value: Optional[bool]) -> int:
+    if value is None:
+        return _UNKNOWN
+    return 1 if value else 0
+
+
+def _decode_bool(value: int) -> Optional[bool]:
+    if value == _UNKNOWN:
+        return None
+    return value == 1
+
+
+class StatePublisher:
+    """Write the latest known receiver state to a shared file."""
+
+    def __init__(self, path: str) -> None:
+        """Create (or truncate) the shared file and map it."""
+        self.path = path
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, SIZE)
+            self._map = mmap.mmap(fd, SIZE, access=mmap.ACCESS_WRITE)
+        finally:
+            os.close(fd)
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._state: Dict[str, Any] = {
+            'volume': None, 'power': None, 'muted': None, 'source': None}
+        _HEADER.pack_into(self._map, 0, MAGIC, LAYOUT_VERSION, self._seq)
+        self._write()
+
+    def close(self) -> None:
+        """Unmap the shared file, readers keep seeing the last state."""
+        self._map.close()
+
+    def publish(self, **state: Any) -> None:
+        """
+        Update one or more of 'volume' (dB), 'power', 'muted' and 'source'.
+
+        Keys that are not given keep their previously published value.
+        """
+        unknown = set(state) - set(self._state)
+        if unknown:
+            raise ValueError('Unknown state keys %s' % sorted(unknown))
+        with self._lock:
+            self._state.update(state)
+            self._write()
+
+    def _write(self) -> None:
+        volume = self._state['volume']
+        source = self._state['source']
+        source_bytes = b"" if source is None else str(source).encode("utf-8")[:SOURCE_SIZE]
+
+        self._seq += 1  # odd: update in progress
+        _SEQ.pack_into(self._map, _SEQ_OFFSET, self._seq & 0xFFFFFFFF)
+        _RECORD.pack_into(
+            self._map, _HEADER.size,
+            time.time(),
+            math.nan if volume is None else float(volume),
+            _encode_bool(self._state['power']),
+            _encode_bool(self._state['muted']),
+            len(source_bytes) if source is not None else 0xFF,
+            source_bytes)
+        self._seq += 1  # even: record is consistent
+        _SEQ.pack_into(self._map, _SEQ_OFFSET, self._seq & 0xFFFFFFFF)
+
+
+class StateReader:
+    """Read the state written by a StatePublisher, without locking."""
+
+    def __init__(self, path: str) -> None:
+        """Map the shared file read-only."""
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), SIZE, access=mmap.ACCESS_READ)
+        magic, version, _ = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != LAYOUT_VERSION:
+            self._map.close()
+            raise ValueError("'%s' is not a NAD state file" % path)
+
+    def close(self) -> None:
+        """Unmap the shared file."""
+        self._map.close()
+
+    def read(self, retries: int = 1000) -> Optional[Dict[str, Any]]:
+        """
+        Return a consistent snapshot of the published state.
+
+        Returns a dictionary with keys 'volume', 'power', 'muted', 'source'
+        and 'updated' (unix time), or None if no consistent snapshot could
+        be taken within the given number of retries. 'volume' is in dB for
+        every receiver type, NADReceiverTCP converts its 0-200 scale.
+        """
+        for _ in range(retries):
+            before = _SEQ.unpack_from(self._map, _SEQ_OFFSET)[0]
+            if before & 1:
+                continue
+            record = _RECORD.unpack_from(self._map, _HEADER.size)
+            if _SEQ.unpack_from(self._map, _SEQ_OFFSET)[0] != before:
+                continue
+
+            updated, volume, power, muted, source_len, source = record
+            return {'volume': None if math.isnan(volume) else volume,
+                    'power': _decode_bool(power),
+                    'muted': _decode_bool(muted),
+                    'source': None if source_len == 0xFF else source[:source_len].decode("utf-8", "replace"),
+                    'updated': updated}
+        return None
+
+
+def read_state(path: str) -> Optional[Dict[str, Any]]:
+    """Read the published state once, see StateReader.read."""
+    reader = StateReader(path)
+    try:
+        return reader.read()
+    finally:
+        reader.close()
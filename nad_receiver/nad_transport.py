@@ -1,9 +1,12 @@
 import abc
+import collections
+import re
 import serial  # type: ignore
 from telnetlib3.telnetlib import Telnet  # type: ignore
 import threading
+import time
 
-from typing import Optional
+from typing import Callable, Deque, Dict, Optional, Tuple
 
 import logging
 
@@ -12,6 +15,27 @@ _LOGGER = logging.getLogger("nad_receiver.transport")
 
 
 DEFAULT_TIMEOUT = 1
+# The connect banner is considered complete once the line is quiet this long
+BANNER_QUIET_TIMEOUT = 0.25
+# Give up draining a banner that never goes quiet
+BANNER_MAX_LINES = 500
+
+_COMMAND_PREFIX = re.compile(r"[^=?+\-]+")
+_STATE_LINE = re.compile(r"(?P<key>\w+(?:\.\w+)+)=(?P<value>.*)")
+
+
+def command_prefix(command: str) -> str:
+    """Return the 'Domain.Function' part of a command, e.g. 'Main.Power?'."""
+    match = _COMMAND_PREFIX.match(command)
+    return match.group() if match else ""
+
+
+def parse_state_line(line: str) -> Optional[Tuple[str, str]]:
+    """Split a 'Domain.Function=Value' line into key and value."""
+    match = _STATE_LINE.fullmatch(line.strip())
+    if not match:
+        return None
+    return match.group("key"), match.group("value")
 
 
 class NadTransport(abc.ABC):
@@ -20,6 +44,79 @@ class NadTransport(abc.ABC):
         pass
 
 
+class SerialLineFramer:
+    """
+    Split the bytes from a serial port into '\\r' terminated frames.
+
+    Reads everything the port has waiting in one call instead of one byte
+    per call. Call mark() right before writing a command: frames received
+    before that, e.g. notifications for a turned volume knob or a reply
+    that came in after an earlier timeout, are never taken as the reply
+    but kept in notifications, as are frames for other commands.
+    """
+
+    MAX_FRAMES = 64
+
+    def __init__(self, ser: serial.Serial) -> None:
+        self.ser = ser
+        self._buffer = bytearray()
+        # Number of bytes at the start of the buffer received before mark()
+        self._stale = 0
+        self._pending: Deque[bytes] = collections.deque(maxlen=self.MAX_FRAMES)
+        self.notifications: Deque[bytes] = collections.deque(maxlen=self.MAX_FRAMES)
+
+    def _split(self) -> None:
+        while True:
+            end = self._buffer.find(serial.CR)
+            if end < 0:
+                return
+            frame = bytes(self._buffer[:end])
+            stale = self._stale > 0
+            del self._buffer[:end + 1]
+            self._stale = max(0, self._stale - (end + 1))
+            if frame.strip():  # replies are framed as '\rMESSAGE\r'
+                (self.notifications if stale else self._pending).append(frame)
+
+    def _fill(self) -> bool:
+        # Blocks for the first byte up to the port timeout, then takes
+        # whatever else is already waiting without another wait
+        data = self.ser.read(max(self.ser.in_waiting, 1))
+        if not data:
+            return False
+        self._buffer += data
+        self._split()
+        return True
+
+    def mark(self) -> None:
+        """Set apart everything received so far, call before writing a command."""
+        waiting = self.ser.in_waiting
+        if waiting:
+            self._buffer += self.ser.read(waiting)
+        self._stale = len(self._buffer)
+        self._split()
+        self.notifications.extend(self._pending)
+        self._pending.clear()
+
+    def read_frame(self, prefix: bytes = b"") -> bytes:
+        """
+        Return the next frame since mark() starting with prefix.
+
+        Other frames are moved to notifications. Returns b'' if no such
+        frame arrives within the port timeout.
+        """
+        timeout = DEFAULT_TIMEOUT if self.ser.timeout is None else self.ser.timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            while self._pending:
+                frame = self._pending.popleft()
+                if frame.strip().startswith(prefix):
+                    return frame
+                _LOGGER.debug("serial notification: %s", frame)
+                self.notifications.append(frame)
+            if time.monotonic() >= deadline or not self._fill():
+                return b""
+
+
 class SerialPortTransport(NadTransport):
     """Transport for NAD protocol over RS-232."""
 
@@ -32,6 +129,7 @@ class SerialPortTransport(NadTransport):
             write_timeout=DEFAULT_TIMEOUT,
         )
         self.lock = threading.Lock()
+        self.framer = SerialLineFramer(self.ser)
 
     def _open_connection(self) -> None:
         if not self.ser.is_open:
@@ -42,15 +140,12 @@ class SerialPortTransport(NadTransport):
         with self.lock:
             self._open_connection()
 
-            self.ser.reset_input_buffer()
+            self.framer.mark()
             self.ser.write(f"\r{command}\r".encode("utf-8"))
-            # To get complete messages, always read until we get '\r'
-            # Messages will be of the form '\rMESSAGE\r' which
-            # pyserial handles nicely
-            msg = self.ser.read_until(serial.CR)
-            if not msg.strip():  # discard '\r' if it was sent
-                msg = self.ser.read_until(serial.CR)
-            assert isinstance(msg, bytes)
+            # Messages will be of the form '\rMESSAGE\r', the reply to
+            # 'Main.Power?' starts with 'Main.Power', anything received
+            # before the write is left over from earlier and skipped
+            msg = self.framer.read_frame(command_prefix(command).encode("utf-8"))
             return msg.strip().decode()
 
 
@@ -59,9 +154,13 @@ class SerialPortTransport(NadTransport):
 # a way that e.g. Home Assistant will not
 # receive any exceptions
 class TelnetTransportWrapper(NadTransport):
-    def __init__(self, host: str, port: int, timeout: int) -> None:
+    def __init__(self, host: str, port: int, timeout: int,
+                 on_banner: Optional[Callable[[Dict[str, str]], None]] = None) -> None:
         """Create NADTelnet."""
         self.nad_telnet = TelnetTransport(host, port, timeout)
+        # Last known 'Domain.Function' -> value, from the banner and replies
+        self.state: Dict[str, str] = {}
+        self.on_banner = on_banner
 
     def __del__(self) -> None:
         """Destroy NADTelnet."""
@@ -74,10 +173,22 @@ class TelnetTransportWrapper(NadTransport):
         # some firmwares sends e.g. b'\rMain.Model=T787\r\n'
         # some firmwares sends multiple lines (BlueOS settings dump ?)
         #    including blank lines between data lines
-        # At least clear the row "\rMain.Model=T787\r\n"
+        # Drain all of it until the line goes quiet, so no banner line is
+        # mistaken for the reply to the next command, and keep what it tells
+        banner: Dict[str, str] = {}
+        timeout: float = self.nad_telnet.timeout
         try:
-            self.nad_telnet.read_until("\n".encode())
-            # Could raise eg. EOFError, UnicodeError
+            for _ in range(BANNER_MAX_LINES):
+                # Could raise eg. EOFError, UnicodeError
+                data = self.nad_telnet.read_until("\n".encode(), timeout)
+                if not data:
+                    break
+                timeout = BANNER_QUIET_TIMEOUT
+                # An odd byte in e.g. a name must not stop the drain
+                for line in data.decode(errors="replace").splitlines():
+                    parsed = parse_state_line(line)
+                    if parsed:
+                        banner[parsed[0]] = parsed[1]
         except EOFError as cc:
             # Connection closed, no recovery
             _LOGGER.debug("Connection closed: %s", cc)
@@ -86,10 +197,18 @@ class TelnetTransportWrapper(NadTransport):
         except UnicodeError as ue:
             # Some unicode error, but connection is open
             _LOGGER.debug("Unicode error: %s", ue)
-            return True
 
+        if banner:
+            _LOGGER.debug("Banner: %s", banner)
+            self.state.update(banner)
+            if self.on_banner:
+                self.on_banner(banner)
         return True
 
+    def connect(self) -> bool:
+        """Open the connection now instead of on the first command."""
+        return self._open_connection()
+
     def _open_connection(self) -> bool:
         if self.nad_telnet.is_open():
             return True
@@ -109,6 +228,9 @@ class TelnetTransportWrapper(NadTransport):
 
         try:
             rsp = self.nad_telnet.communicate(cmd)
+            parsed = parse_state_line(rsp)
+            if parsed:
+                self.state[parsed[0]] = parsed[1]
         except (EOFError,BrokenPipeError, ConnectionResetError) as cc:
             # Connection closed
             _LOGGER.debug("Connection closed: %s", cc)
@@ -158,11 +280,13 @@ class TelnetTransport(NadTransport):
             _LOGGER.debug("Close connection to: '%s:%s'" % (self.host, self.port))
             telnet.close()
 
-    def read_until(self, data) -> None:
+    def read_until(self, data: bytes, timeout: Optional[float] = None) -> bytes:
         if not self.telnet:
             raise Exception("Connection is closed")
 
-        self.telnet.read_until(data, self.timeout)
+        rsp = self.telnet.read_until(data, self.timeout if timeout is None else timeout)
+        assert isinstance(rsp, bytes)
+        return rsp
 
     def communicate(self, cmd: str) -> str:
         if not self.telnet:
@@ -0,0 +1,107 @@
+import asyncio
+import codecs
+import time
+from typing import List
+
+import pytest  # type: ignore
+
+import nad_receiver
+from nad_receiver import nad_discovery
+from nad_receiver.nad_discovery import async_discover
+
+# volume 0x64, power on, not muted, source Optical 1
+D7050_STATUS = codecs.decode(b"0001020464" b"0001020901" b"0001020a00" b"0001020302", "hex_codec")
+
+
+async def _banner(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    writer.write(b"\rMain.Model=T787\r\n")
+    await reader.read()
+    writer.close()
+
+
+async def _asked(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    if (await reader.readuntil(b"\r")).strip() == b"Main.Model?":
+        writer.write(b"\nMain.Model=T758\r")
+    await reader.read()
+    writer.close()
+
+
+async def _d7050(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    await reader.readexactly(len(nad_receiver.NADReceiverTCP.POLL_STATUS) // 2)
+    writer.write(D7050_STATUS)
+    await writer.drain()
+    writer.close()
+
+
+async def _silent(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    await reader.read()
+    writer.close()
+
+
+async def _discover(telnet_handler, tcp_handler) -> List:  # type: ignore
+    telnet = await asyncio.start_server(telnet_handler, "127.0.0.1", 0)
+    tcp = await asyncio.start_server(tcp_handler, "127.0.0.1", 0)
+    async with telnet, tcp:
+        return await async_discover(["127.0.0.1/32"],
+                                    telnet_port=telnet.sockets[0].getsockname()[1],
+                                    tcp_port=tcp.sockets[0].getsockname()[1],
+                                    timeout=0.2)
+
+
+def test_discover_banner_and_d7050() -> None:
+    found = asyncio.run(_discover(_banner, _d7050))
+    assert len(found) == 2
+    telnet, tcp = found
+    assert isinstance(telnet, nad_receiver.NADReceiverTelnet)
+    assert telnet.model() == "T787"
+    assert isinstance(tcp, nad_receiver.NADReceiverTCP)
+
+
+def test_discover_asks_for_model() -> None:
+    found = asyncio.run(_discover(_asked, _silent))
+    assert len(found) == 1
+    assert found[0].model() == "T758"
+
+
+def test_discover_ignores_other_devices() -> None:
+    assert asyncio.run(_discover(_silent, _silent)) == []
+
+
+def test_large_network_is_probed_lazily(monkeypatch) -> None:
+    running = 0
+    peak = 0
+
+    async def refused(host: str, port: int, timeout: float) -> None:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.001)
+        running -= 1
+        raise ConnectionRefusedError
+
+    monkeypatch.setattr(nad_discovery, "_probe_telnet", refused)
+    monkeypatch.setattr(nad_discovery, "_probe_tcp", refused)
+
+    async def sweep() -> None:
+        # A /8 must neither build all its probes up front nor exceed the pool
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(async_discover(["10.0.0.0/8"], concurrency=8), 0.2)
+
+    start = time.monotonic()
+    asyncio.run(sweep())
+    assert time.monotonic() - start < 2
+    assert 0 < peak <= 8
+
+
+def test_read_model_from_chatty_stream() -> None:
+    async def read(*chunks: bytes) -> object:
+        reader = asyncio.StreamReader()
+        for chunk in chunks:
+            reader.feed_data(chunk)
+        reader.feed_eof()
+        return await nad_discovery._read_model(reader, 1.0)
+
+    junk = b"x" * 1000 + b"\r\n"
+    # a megabyte of noise before the model, the line split over two reads
+    assert asyncio.run(read(junk * 1000 + b"\rMain.Mo", b"del=T787\r\n")) == "T787"
+    assert asyncio.run(read(junk * 1000)) is None
@@ -0,0 +1,116 @@
+import pytest  # type: ignore
+
+from nad_receiver.nad_history import MAX_CODES, StateHistory
+from test_nad_protocol import Fake_NAD_C_356BE
+from test_nad_state import Fake_D7050, NotificationTransport
+
+
+def test_records_changes_only() -> None:
+    history = StateHistory()
+    assert history.record("Main.Source", "CD", 1.0)
+    assert not history.record("Main.Source", "CD", 2.0)
+    assert history.record("Main.Volume", -40.0, 3.0)
+    assert history.record("power", True, 4.0)
+    assert history.record("Main.Source", "AUX", 5.0)
+
+    assert history.between() == [(1.0, "Main.Source", "CD"),
+                                 (3.0, "Main.Volume", -40.0),
+                                 (4.0, "power", True),
+                                 (5.0, "Main.Source", "AUX")]
+    assert history.between(3.0, 5.0) == [(3.0, "Main.Volume", -40.0),
+                                         (4.0, "power", True)]
+    assert history.between(key="Main.Source") == [(1.0, "Main.Source", "CD"),
+                                                  (5.0, "Main.Source", "AUX")]
+    assert history.between(key="Main.Mute") == []
+
+
+def test_ring_buffer_keeps_newest() -> None:
+    history = StateHistory(capacity=3)
+    for second in range(10):
+        history.record("Main.Volume", float(second), float(second))
+    assert len(history) == 3
+    assert [change[2] for change in history.between()] == [7.0, 8.0, 9.0]
+    assert history.between(8.0) == [(8.0, "Main.Volume", 8.0), (9.0, "Main.Volume", 9.0)]
+
+
+def test_binary_round_trip() -> None:
+    history = StateHistory(capacity=4)
+    for second, source in enumerate(["CD", "AUX", "CD", "TUNER", "MP"]):
+        history.record("Main.Source", source, float(second))
+    history.record("muted", False, 10.0)
+
+    data = history.to_bytes()
+    assert StateHistory.from_bytes(data).between() == history.between()
+    assert StateHistory.from_bytes(data, capacity=2).between() == history.between()[-2:]
+
+    with pytest.raises(ValueError):
+        StateHistory.from_bytes(b"NOPE" + data[4:])
+
+
+def test_receiver_records_replies() -> None:
+    receiver = Fake_NAD_C_356BE()
+    receiver.recorder = StateHistory()
+
+    receiver.main_power("=", "On")
+    receiver.main_source("=", "AUX")
+    receiver.main_source("?")
+    receiver.main_source("+")
+
+    assert [change[1:] for change in receiver.recorder.between()] == [
+        ("Main.Power", "On"),
+        ("Main.Source", "AUX"),
+        ("Main.Source", "TAPE2"),
+    ]
+
+
+def test_codes_are_reused_over_a_long_run() -> None:
+    history = StateHistory(capacity=100)
+    # more distinct strings than there are codes, e.g. a tuner over months
+    for second in range(MAX_CODES + 5000):
+        assert history.record("Tuner.FM.Frequency", "%d.%d" % divmod(second, 10), float(second))
+    assert len(history) == 100
+    assert len(history._strings) <= 2 * 100 + 2
+    assert history.between()[-1] == (float(second), "Tuner.FM.Frequency", "%d.%d" % divmod(second, 10))
+
+    restored = StateHistory.from_bytes(history.to_bytes())
+    assert restored.between() == history.between()
+
+
+def test_tcp_receiver_uses_the_same_keys() -> None:
+    receiver = Fake_D7050("127.0.0.1")
+    receiver.recorder = StateHistory()
+    receiver.status()
+
+    assert [change[1:] for change in receiver.recorder.between()] == [
+        ("Main.Volume", -40.0),
+        ("Main.Power", "On"),
+        ("Main.Mute", "Off"),
+        ("Main.Source", "Optical 1"),
+    ]
+
+
+def test_receiver_records_under_reply_key() -> None:
+    receiver = Fake_NAD_C_356BE()
+    receiver.transport = NotificationTransport()
+    receiver.recorder = StateHistory()
+
+    receiver.main_power("?")
+    receiver.main_source("?")
+
+    assert [change[1:] for change in receiver.recorder.between()] == [
+        ("Main.Volume", -39.0),
+    ]
+
+
+def test_times_never_go_back() -> None:
+    history = StateHistory()
+    history.record("Main.Volume", -40.0, 100.0)
+    # clock stepped back
+    history.record("Main.Volume", -41.0, 50.0)
+    history.record("Main.Volume", -42.0, 200.0)
+
+    assert history.between() == [(100.0, "Main.Volume", -40.0),
+                                 (100.0, "Main.Volume", -41.0),
+                                 (200.0, "Main.Volume", -42.0)]
+    assert [change[2] for change in history.between(60.0)] == [-40.0, -41.0, -42.0]
+    assert [change[2] for change in history.between(60.0, 150.0)] == [-40.0, -41.0]
@@ -0,0 +1,130 @@
+import socket
+import threading
+import time
+from typing import List
+
+import pytest  # type: ignore
+
+import nad_receiver
+from nad_receiver.nad_fake_transport import Fake_NAD_C_356BE_Transport
+from nad_receiver.nad_pacing import AdaptivePacer, PacedTransport
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: List[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _pacer(clock: FakeClock, **kwargs) -> AdaptivePacer:  # type: ignore
+    return AdaptivePacer(clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def test_spaces_commands_at_rate() -> None:
+    clock = FakeClock()
+    pacer = _pacer(clock, rate=10.0)
+    pacer.acquire()  # the first command goes out right away
+    pacer.acquire()
+    pacer.acquire()
+    assert clock.sleeps == pytest.approx([0.1, 0.1])
+
+
+def test_aimd() -> None:
+    clock = FakeClock()
+    pacer = _pacer(clock, rate=10.0, min_rate=2.0, max_rate=12.0)
+    pacer.success()
+    pacer.success()
+    pacer.success()
+    assert pacer.rate == 12.0
+    pacer.failure()
+    assert pacer.rate == 6.0
+    pacer.failure()
+    pacer.failure()
+    assert pacer.rate == 2.0
+    assert pacer.interval == 0.5
+
+    with pytest.raises(ValueError):
+        _pacer(clock, rate=1.0, min_rate=2.0)
+
+
+def test_defer() -> None:
+    clock = FakeClock()
+    pacer = _pacer(clock, rate=10.0)
+    pacer.acquire()
+    pacer.defer(0.5)
+    pacer.acquire()
+    assert clock.sleeps == pytest.approx([0.5])
+
+
+def test_paced_transport() -> None:
+    clock = FakeClock()
+    pacer = _pacer(clock, rate=10.0)
+    transport = PacedTransport(Fake_NAD_C_356BE_Transport(), pacer)
+
+    assert transport.communicate("Main.Power=On") == "Main.Power=On"
+    assert pacer.rate == 11.0
+    # garbled command, the fake device does not answer
+    assert transport.communicate("Main.Power") == ""
+    assert pacer.rate == 5.5
+
+
+def _slow_d7050(server: socket.socket, polls: int) -> None:
+    """Answer each of the 4 status polls 15 ms apart, like a busy D 7050."""
+    frames = [b"\x00\x01\x02\x04\x64", b"\x00\x01\x02\x09\x01",
+              b"\x00\x01\x02\x0a\x00", b"\x00\x01\x02\x03\x02"]
+    for _ in range(polls):
+        conn, _ = server.accept()
+        with conn:
+            conn.recv(64)
+            for frame in frames:
+                time.sleep(0.015)
+                conn.sendall(frame)
+
+
+def test_tcp_status_survives_fast_pacing() -> None:
+    polls = 15
+    server = socket.create_server(("127.0.0.1", 0))
+    thread = threading.Thread(target=_slow_d7050, args=(server, polls), daemon=True)
+    thread.start()
+
+    pacer = AdaptivePacer(rate=40.0, max_rate=1000.0, increase=100.0)
+    receiver = nad_receiver.NADReceiverTCP("127.0.0.1", server.getsockname()[1], pacer)
+    for _ in range(polls):
+        assert receiver.status() == {'volume': 100, 'power': True,
+                                     'muted': False, 'source': 'Optical 1'}
+    # one success per status, never a failure in between
+    assert pacer.rate == 1000.0
+
+    thread.join(1)
+    server.close()
+
+
+def test_tcp_connect_timeout_backs_off() -> None:
+    # A listener that never accepts: once its backlog is full, connects time out
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(0)
+    port = server.getsockname()[1]
+    held = []
+    try:
+        for _ in range(8):
+            held.append(socket.create_connection(("127.0.0.1", port), timeout=0.1))
+    except socket.timeout:
+        pass
+
+    pacer = AdaptivePacer(rate=10.0)
+    receiver = nad_receiver.NADReceiverTCP("127.0.0.1", port, pacer)
+    receiver.CONNECT_TIMEOUT = 0.1
+    assert receiver.status() is None
+    assert pacer.rate == 5.0
+
+    for sock in held:
+        sock.close()
+    server.close()
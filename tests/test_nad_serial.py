@@ -0,0 +1,124 @@
+from typing import List
+
+from nad_receiver.nad_transport import SerialLineFramer
+
+
+class FakePort:
+    """Hands out the given chunks, one chunk per read."""
+
+    timeout = 1
+
+    def __init__(self, *chunks: bytes) -> None:
+        self.chunks = list(chunks)
+        self.reads = 0
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self.chunks[0]) if self.chunks else 0
+
+    def read(self, size: int = 1) -> bytes:
+        self.reads += 1
+        if not self.chunks:
+            return b""
+        chunk = self.chunks.pop(0)
+        assert size >= len(chunk)
+        return chunk
+
+
+class ScriptedPort:
+    """Answers every write with the next reply, unsolicited frames can be added."""
+
+    timeout = 0.05
+
+    def __init__(self, *replies: bytes) -> None:
+        self.replies: List[bytes] = list(replies)
+        self.received = bytearray()
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self.received)
+
+    def receive(self, data: bytes) -> None:
+        self.received += data
+
+    def write(self, data: bytes) -> int:
+        if self.replies:
+            self.received += self.replies.pop(0)
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        data = bytes(self.received[:size])
+        del self.received[:size]
+        return data
+
+
+def _communicate(port: ScriptedPort, framer: SerialLineFramer, prefix: bytes) -> bytes:
+    framer.mark()
+    port.write(b"\r" + prefix + b"?\r")
+    return framer.read_frame(prefix)
+
+
+def test_frames_from_one_read() -> None:
+    port = FakePort(b"\rMain.Power=On\r\rMain.Volume=-40\r")
+    framer = SerialLineFramer(port)
+    assert framer.read_frame(b"Main.Power") == b"Main.Power=On"
+    assert framer.read_frame(b"Main.Volume") == b"Main.Volume=-40"
+    assert port.reads == 1
+    assert framer.read_frame(b"Main.Volume") == b""
+
+
+def test_frame_split_over_reads() -> None:
+    port = FakePort(b"\rMain.Sou", b"rce=CD\r")
+    framer = SerialLineFramer(port)
+    assert framer.read_frame(b"Main.Source") == b"Main.Source=CD"
+    assert port.reads == 2
+
+
+def test_other_frames_become_notifications() -> None:
+    port = FakePort(b"\rMain.Mute=On\r\rMain.Power=Off\r")
+    framer = SerialLineFramer(port)
+    assert framer.read_frame(b"Main.Power") == b"Main.Power=Off"
+    assert list(framer.notifications) == [b"Main.Mute=On"]
+
+
+def test_frames_before_the_command_are_not_replies() -> None:
+    port = ScriptedPort(b"\rMain.Volume=-38\r", b"\rMain.Volume=-37\r")
+    framer = SerialLineFramer(port)
+
+    # volume knob turned before the commands
+    port.receive(b"\rMain.Volume=-39\r")
+    assert _communicate(port, framer, b"Main.Volume") == b"Main.Volume=-38"
+    port.receive(b"\rMain.Volume=-39\r")
+    assert _communicate(port, framer, b"Main.Volume") == b"Main.Volume=-37"
+    assert list(framer.notifications) == [b"Main.Volume=-39", b"Main.Volume=-39"]
+
+
+def test_partial_frame_before_the_command_is_not_a_reply() -> None:
+    port = ScriptedPort(b"ume=-39\r\rMain.Volume=-38\r")
+    framer = SerialLineFramer(port)
+
+    port.receive(b"\rMain.Vol")
+    assert _communicate(port, framer, b"Main.Volume") == b"Main.Volume=-38"
+    assert list(framer.notifications) == [b"Main.Volume=-39"]
+
+
+def test_late_reply_is_not_taken_by_next_command() -> None:
+    port = ScriptedPort(b"", b"\rMain.Volume=-37\r")
+    framer = SerialLineFramer(port)
+
+    assert _communicate(port, framer, b"Main.Volume") == b""
+    # the reply to the first command arrives after its timeout
+    port.receive(b"\rMain.Volume=-38\r")
+    assert _communicate(port, framer, b"Main.Volume") == b"Main.Volume=-37"
+
+
+class ChattyPort(ScriptedPort):
+    """Never goes quiet, but never answers the command either."""
+
+    def read(self, size: int = 1) -> bytes:
+        return b"\rMain.Mute=On\r"
+
+
+def test_read_frame_gives_up_after_timeout() -> None:
+    framer = SerialLineFramer(ChattyPort())
+    assert framer.read_frame(b"Main.Power") == b""
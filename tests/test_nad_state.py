@@ -0,0 +1,104 @@
+from typing import Optional
+
+import pytest  # type: ignore
+
+import nad_receiver
+from nad_receiver.nad_fake_transport import Fake_NAD_C_356BE_Transport
+from nad_receiver.nad_state import StatePublisher, StateReader, read_state
+from test_nad_protocol import Fake_NAD_C_356BE
+
+
+def test_state_file_round_trip(tmp_path) -> None:
+    path = str(tmp_path / "nad_state")
+    publisher = StatePublisher(path)
+    reader = StateReader(path)
+
+    state = reader.read()
+    assert state is not None
+    assert state['power'] is None
+    assert state['volume'] is None
+    assert state['source'] is None
+
+    publisher.publish(power=True, volume=-40.5, source="Optical 1")
+    publisher.publish(muted=False)
+    state = reader.read()
+    assert state is not None
+    assert state['power'] is True
+    assert state['muted'] is False
+    assert state['volume'] == -40.5
+    assert state['source'] == "Optical 1"
+
+    with pytest.raises(ValueError):
+        publisher.publish(dimmer=1)
+
+    reader.close()
+    publisher.close()
+    assert read_state(path) == state
+
+
+def test_not_a_state_file(tmp_path) -> None:
+    path = tmp_path / "other"
+    path.write_bytes(b"\0" * 128)
+    with pytest.raises(ValueError):
+        StateReader(str(path))
+
+
+def test_receiver_publishes_replies(tmp_path) -> None:
+    path = str(tmp_path / "nad_state")
+    receiver = Fake_NAD_C_356BE()
+    receiver.publisher = StatePublisher(path)
+
+    receiver.main_power("=", "On")
+    receiver.main_mute("=", "On")
+    receiver.main_source("=", "AUX")
+
+    state = read_state(path)
+    assert state is not None
+    assert state['power'] is True
+    assert state['muted'] is True
+    assert state['source'] == "AUX"
+
+
+class Fake_D7050(nad_receiver.NADReceiverTCP):
+    """D 7050 that answers every status poll with volume 100 (-40dB)."""
+
+    def _send(self, message: str, read_reply: bool = False) -> Optional[str]:
+        return "0001020464" "0001020901" "0001020a00" "0001020302"
+
+
+def test_tcp_receiver_publishes_db(tmp_path) -> None:
+    path = str(tmp_path / "nad_state")
+    receiver = Fake_D7050("127.0.0.1")
+    receiver.publisher = StatePublisher(path)
+
+    status = receiver.status()
+    assert status is not None
+    assert status['volume'] == 100
+
+    state = read_state(path)
+    assert state is not None
+    assert state['volume'] == -40.0
+    assert state['source'] == "Optical 1"
+
+
+class NotificationTransport(Fake_NAD_C_356BE_Transport):
+    """Answers every command with a volume knob notification."""
+
+    def communicate(self, command: str) -> str:
+        return "Main.Volume=-39"
+
+
+def test_receiver_publishes_under_reply_key(tmp_path) -> None:
+    path = str(tmp_path / "nad_state")
+    receiver = Fake_NAD_C_356BE()
+    receiver.transport = NotificationTransport()
+    receiver.publisher = StatePublisher(path)
+
+    receiver.main_power("?")
+    receiver.main_source("?")
+
+    state = read_state(path)
+    assert state is not None
+    assert state['power'] is None
+    assert state['source'] is None
+    assert state['volume'] == -39.0
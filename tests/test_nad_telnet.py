@@ -0,0 +1,67 @@
+import socket
+import threading
+
+import nad_receiver
+
+BANNER = b"\rMain.Model=T787\r\n\r\nMain.Power=On\r\nMain.Volume=-48\r\nMain.Source=3\r\n"
+
+
+def _serve(server: socket.socket, banner: bytes = BANNER) -> None:
+    conn, _ = server.accept()
+    with conn:
+        conn.sendall(banner)
+        data = b""
+        while not data.endswith(b"\r"):
+            chunk = conn.recv(64)
+            if not chunk:
+                return
+            data += chunk
+        assert data.strip() == b"Main.Mute?"
+        conn.sendall(b"\nMain.Mute=Off\r")
+        conn.recv(64)
+
+
+def test_banner_seeds_state() -> None:
+    server = socket.create_server(("127.0.0.1", 0))
+    port = server.getsockname()[1]
+    thread = threading.Thread(target=_serve, args=(server,), daemon=True)
+    thread.start()
+
+    receiver = nad_receiver.NADReceiverTelnet("127.0.0.1", port)
+    assert receiver.connect()
+    assert receiver.model() == "T787"
+    assert receiver.known_state() == {
+        "Main.Model": "T787",
+        "Main.Power": "On",
+        "Main.Volume": "-48",
+        "Main.Source": "3",
+    }
+
+    # Banner lines were drained, so the reply belongs to this command
+    assert receiver.main_mute("?") == "Off"
+    assert receiver.known_state()["Main.Mute"] == "Off"
+
+    receiver.telnet.nad_telnet.close_connection()
+    server.close()
+    thread.join(1)
+
+
+def test_banner_with_invalid_utf8() -> None:
+    banner = b"\rMain.Model=T787\r\nMain.Name=Caf\xe9\r\nMain.Power=On\r\n"
+    server = socket.create_server(("127.0.0.1", 0))
+    port = server.getsockname()[1]
+    thread = threading.Thread(target=_serve, args=(server, banner), daemon=True)
+    thread.start()
+
+    receiver = nad_receiver.NADReceiverTelnet("127.0.0.1", port)
+    assert receiver.connect()
+    assert receiver.known_state()["Main.Model"] == "T787"
+    assert receiver.known_state()["Main.Power"] == "On"
+    assert receiver.known_state()["Main.Name"] == "Caf\ufffd"
+
+    # The whole banner was drained despite the invalid byte
+    assert receiver.main_mute("?") == "Off"
+
+    receiver.telnet.nad_telnet.close_connection()
+    server.close()
+    thread.join(1)